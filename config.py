@@ -1,13 +1,15 @@
 from pydantic_settings import BaseSettings
-from pydantic import field_validator
-from functools import lru_cache
+from pydantic import Field
+from functools import cached_property, lru_cache
 from utils.crypto_utils import decrypt
 
 
 class Settings(BaseSettings):
     # Feishu App
     feishu_app_id: str
-    feishu_app_secret: str
+    # Raw env value, possibly "ENC:"-prefixed; decrypted lazily below so
+    # settings load doesn't pay for decryption until the secret is used
+    feishu_app_secret_raw: str = Field(validation_alias="feishu_app_secret")
     feishu_verification_token: str
     feishu_signing_secret: str = ""
 
@@ -24,13 +26,10 @@ class Settings(BaseSettings):
     # email_expense: str = ""  # for email
     # email_payment_sweden_shic: str = ""  # for email
 
-    # Auto-decrypt encrypted values (starting with "ENC:")
-    @field_validator("feishu_app_secret", mode="before")
-    @classmethod
-    def decrypt_secret(cls, v):
-        if isinstance(v, str) and v.startswith("ENC:"):
-            return decrypt(v)
-        return v
+    @cached_property
+    def feishu_app_secret(self) -> str:
+        """Decrypted app secret, computed on first access and cached."""
+        return decrypt(self.feishu_app_secret_raw)
 
     class Config:
         env_file = ".env"
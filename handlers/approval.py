@@ -1,10 +1,55 @@
+import logging
 from typing import Any, Optional
+
+import msgspec
+import orjson
+
 from config import Settings
 from services import FeishuClient, AttachmentService, DropboxUploader
 # from services import EmailSender  # for email
 
+logger = logging.getLogger(__name__)
+
+
+# Typed views of the approval event, covering both v1.0 and v2.0 shapes.
+# msgspec's C decoder fills these straight from the webhook bytes; unknown
+# fields are ignored and absent ones fall back to the defaults.
+class ApprovalObject(msgspec.Struct):
+    """v2.0 payload nested under event.object."""
+    status: str = ""
+    instance_code: str = ""
+
+
+class ApprovalEventBody(msgspec.Struct):
+    status: str = ""
+    instance_status: str = ""
+    instance_code: str = ""
+    approval_code: str = ""
+    object: ApprovalObject = msgspec.field(default_factory=ApprovalObject)
+
+
+class ApprovalEventHeader(msgspec.Struct):
+    event_type: str = ""
+
+
+class ApprovalEvent(msgspec.Struct):
+    header: ApprovalEventHeader = msgspec.field(default_factory=ApprovalEventHeader)
+    event: ApprovalEventBody = msgspec.field(default_factory=ApprovalEventBody)
+
 
 class ApprovalHandler:
+    # One handler instance lives for the whole process; slots skip the
+    # per-instance __dict__ and give faster attribute access per event.
+    # The email_sender/_email_map slots are reserved for the email flow.
+    __slots__ = (
+        "settings",
+        "feishu_client",
+        "attachment_service",
+        "dropbox_uploader",
+        "email_sender",
+        "_email_map",
+    )
+
     KNOWN_APPROVAL_NAMES = {"费用报销", "付款-瑞典对公-SHIC"}
 
     # Mapping: approval_name (Chinese) -> settings attribute name (English)  # for email
@@ -29,57 +74,64 @@ class ApprovalHandler:
         #     api_key=settings.resend_api_key,  # for email
         #     from_email=settings.resend_from_email,  # for email
         # )  # for email
+        # # Pre-resolve approval name -> target email once at init so the  # for email
+        # # per-event lookup skips pydantic attribute dispatch  # for email
+        # self._email_map = {  # for email
+        #     name: getattr(settings, attr, "") or None  # for email
+        #     for name, attr in self.APPROVAL_EMAIL_ATTRS.items()  # for email
+        # }  # for email
 
     # def _get_target_email(self, approval_name: str) -> Optional[str]:  # for email
     #     """Get target email based on approval name from settings."""  # for email
-    #     attr_name = self.APPROVAL_EMAIL_ATTRS.get(approval_name)  # for email
-    #     if not attr_name:  # for email
-    #         return None  # for email
-    #     email = getattr(self.settings, attr_name, "")  # for email
-    #     return email if email else None  # for email
+    #     return self._email_map.get(approval_name)  # for email
 
-    async def handle_event(self, event: dict[str, Any]) -> bool:
+    async def handle_event(self, event: bytes | dict[str, Any]) -> bool:
         """Handle approval status changed event.
 
-        Only processes APPROVED status events from approval_instance event type.
+        Accepts the raw webhook bytes (preferred, decoded by msgspec's C
+        decoder) or an already-parsed dict. Only processes APPROVED status
+        events from approval_instance event type.
         Returns True if email was sent successfully, False otherwise.
         """
-        # Check event type - only process approval_instance events
-        header = event.get("header", {})
-        event_type = header.get("event_type", "")
-        if event_type and "approval_instance" not in event_type:
-            print(f"Skipping non-instance event type: {event_type}")
+        try:
+            if isinstance(event, (bytes, bytearray, str)):
+                parsed = msgspec.json.decode(event, type=ApprovalEvent)
+            else:
+                parsed = msgspec.convert(event, ApprovalEvent, strict=False)
+        except (msgspec.DecodeError, msgspec.ValidationError) as e:
+            logger.warning("Unrecognized event shape: %s", e)
             return False
 
-        # Extract event data - handle both v1 and v2 event formats
-        event_data = event.get("event", {})
-
-        # Get approval status - check multiple possible fields
-        status = (
-            event_data.get("status")
-            or event_data.get("instance_status")
-            or event_data.get("object", {}).get("status")
-        )
+        # Status first: most events in production are not APPROVED, so the
+        # common case bails after one comparison
+        event_data = parsed.event
+        status = event_data.status or event_data.instance_status or event_data.object.status
         if status != "APPROVED":
-            print(f"Skipping event with status: {status}")
+            logger.info("Skipping event with status: %s", status)
+            return False
+
+        # Check event type - only process approval_instance events
+        event_type = parsed.header.event_type
+        if event_type and "approval_instance" not in event_type:
+            logger.info("Skipping non-instance event type: %s", event_type)
             return False
 
         # Get instance code
         instance_code = (
-            event_data.get("instance_code")
-            or event_data.get("approval_code")
-            or event_data.get("object", {}).get("instance_code")
+            event_data.instance_code
+            or event_data.approval_code
+            or event_data.object.instance_code
         )
         if not instance_code:
-            print("No instance_code found in event")
+            logger.warning("No instance_code found in event")
             return False
 
-        print(f"Processing approved instance: {instance_code}")
+        logger.info("Processing approved instance: %s", instance_code)
 
         try:
             return await self._process_approval(instance_code)
         except Exception as e:
-            print(f"Error processing approval {instance_code}: {e}")
+            logger.error("Error processing approval %s: %s", instance_code, e)
             raise
 
     async def _process_approval(self, instance_code: str) -> bool:
@@ -88,89 +140,54 @@ class ApprovalHandler:
         Returns True if files were uploaded to Dropbox successfully, False otherwise.
         """
         # 1. Get approval instance details
-        print(f"Fetching approval instance details for {instance_code}...")
+        logger.info("Fetching approval instance details for %s...", instance_code)
         instance = await self.feishu_client.get_approval_instance(instance_code)
         approval_name = instance.get("approval_name", "")
         form_json = instance.get("form", "[]")
-        print(f"Got instance data, approval_name: {approval_name!r}")
+        logger.info("Got instance data, approval_name: %r", approval_name)
 
         # 2. Check approval name is known
         if approval_name not in self.KNOWN_APPROVAL_NAMES:
-            print(f"Approval '{approval_name}' not in known types, skipping {instance_code}")
+            logger.info("Approval %r not in known types, skipping %s", approval_name, instance_code)
             return False
 
         # 3. Extract serial_number and end_time for Dropbox path
         serial_number = instance.get("serial_number", instance_code)
         end_time_ms = int(instance.get("end_time", 0))
 
-        # 4. Extract attachments from form
-        attachments = self.attachment_service.extract_attachments_from_form(form_json)
+        # 4. Parse the form once and scan it in a single pass
+        # (title/amount from the scan are only used by the email flow)
+        try:
+            form_data = orjson.loads(form_json)
+        except orjson.JSONDecodeError:
+            form_data = []
+        scan = self.attachment_service.scan_form(form_data)
+        attachments = scan.attachments
         if not attachments:
-            print(f"No attachments found for instance {instance_code}")
+            logger.info("No attachments found for instance %s", instance_code)
             return False
 
-        print(f"Found {len(attachments)} attachments, downloading...")
+        logger.info("Found %d attachments, downloading...", len(attachments))
 
         # 5. Download attachments
         downloaded = await self.attachment_service.download_attachments(attachments)
         if not downloaded:
-            print(f"Failed to download any attachments for instance {instance_code}")
+            logger.warning("Failed to download any attachments for instance %s", instance_code)
             return False
 
         # 6. Upload to Dropbox
-        print(f"Uploading {len(downloaded)} attachments to Dropbox for {instance_code}...")
+        logger.info("Uploading %d attachments to Dropbox for %s...", len(downloaded), instance_code)
         uploaded = self.dropbox_uploader.upload_attachments(
             downloaded, end_time_ms, serial_number, approval_name
         )
         folder = "/".join(uploaded[0].split("/")[:4]) + "/" if uploaded else ""
-        print(f"Uploaded {len(uploaded)} files to Dropbox:{folder} for {instance_code}")
+        logger.info("Uploaded %d files to Dropbox:%s for %s", len(uploaded), folder, instance_code)
         return len(uploaded) > 0
 
         # --- for email (old flow) ---
-        # # 3. Get approval title and amount from form
-        # form_data = json.loads(form_json)
-        # approval_title = ""
-        # approval_amount = ""
-        # expense_contents = []
-        # for field in form_data:
-        #     field_name = field.get("name", "")
-        #     field_type = field.get("type", "")
-        #     if field_name in ("名称", "付款事由") and field_type in ("input", "textarea"):
-        #         if not approval_title:
-        #             approval_title = field.get("value", "").strip()
-        #     elif field_name in ("金额", "付款金额") and field_type == "amount":
-        #         amount_value = field.get("value", "")
-        #         ext = field.get("ext", {})
-        #         currency = ext.get("currency", "SEK") if isinstance(ext, dict) else "SEK"
-        #         approval_amount = f"{amount_value} {currency}"
-        #     elif field_type == "fieldList":
-        #         if not approval_amount:
-        #             ext = field.get("ext", [])
-        #             if isinstance(ext, list):
-        #                 for item in ext:
-        #                     if item.get("type") == "amount":
-        #                         sum_items = item.get("sumItems", "")
-        #                         if sum_items:
-        #                             try:
-        #                                 sums = json.loads(sum_items)
-        #                                 parts = [f"{s.get('value', '')} {s.get('currency', '')}" for s in sums]
-        #                                 approval_amount = ", ".join(parts)
-        #                             except json.JSONDecodeError:
-        #                                 approval_amount = item.get("value", "")
-        #                             break
-        #         rows = field.get("value", [])
-        #         if isinstance(rows, list):
-        #             for row in rows:
-        #                 if isinstance(row, list):
-        #                     for cell in row:
-        #                         if cell.get("name") == "报销内容" and cell.get("type") == "input":
-        #                             content = cell.get("value", "").strip()
-        #                             if content:
-        #                                 expense_contents.append(content)
-        # if expense_contents:
-        #     approval_title = "-".join(expense_contents)
-        # elif not approval_title:
-        #     approval_title = instance.get("serial_number", instance_code)
+        # # 3. Get approval title and amount from the single-pass form scan above
+        # approval_title = scan.title or instance.get("serial_number", instance_code)
+        # approval_amount = scan.amount
         # # 2. Get target email  # for email
         # target_email = self._get_target_email(approval_name)  # for email
         # if not target_email:  # for email
@@ -1,6 +1,7 @@
 import json
 import hmac
 import hashlib
+import logging
 from typing import Any, Dict, Set
 
 from fastapi import FastAPI, Request, HTTPException
@@ -9,6 +10,9 @@ from fastapi.responses import JSONResponse
 from config import get_settings
 from handlers import ApprovalHandler
 
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
 APP = FastAPI()
 
 # Event deduplication - in production, use Redis or database
@@ -119,9 +123,8 @@ def get_instance_code(body: Dict[str, Any]) -> str:
     )
 
 
-async def process_approval_event(body: Dict[str, Any]) -> None:
+async def process_approval_event(body: Dict[str, Any], raw_body: bytes) -> None:
     """Background task to process approval event."""
-    import traceback
     instance_code = get_instance_code(body)
 
     # Check status first - only do instance dedup for APPROVED events
@@ -135,14 +138,21 @@ async def process_approval_event(body: Dict[str, Any]) -> None:
     # For APPROVED events, check and mark instance to prevent concurrent processing
     if status == "APPROVED" and instance_code:
         if not check_and_mark_instance(instance_code):
-            print(f"Instance {instance_code} already being processed, skipping")
+            logger.info("Instance %s already being processed, skipping", instance_code)
             return
 
     try:
-        await approval_handler.handle_event(body)
-    except Exception as e:
-        print(f"Error processing approval event: {e}")
-        traceback.print_exc()
+        # Hand the handler the raw bytes so its typed decoder parses them
+        # directly instead of converting the already-built dict
+        await approval_handler.handle_event(raw_body)
+    except Exception:
+        logger.exception("Error processing approval event")
+
+
+@APP.on_event("shutdown")
+async def shutdown():
+    """Close pooled HTTP connections on shutdown."""
+    await approval_handler.feishu_client.aclose()
 
 
 @APP.get("/health")
@@ -169,19 +179,20 @@ async def feishu_webhook(request: Request):
     if body.get("type") == "url_verification" and "challenge" in body:
         return JSONResponse({"challenge": body["challenge"]})
 
-    # Debug: print full event body
-    print(f"=== Received webhook ===")
-    print(f"Body: {json.dumps(body, ensure_ascii=False, indent=2)}")
+    # Debug: dump full event body only when debug logging is on, so the
+    # pretty-printed json.dumps never runs in production
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received webhook body: %s", json.dumps(body, ensure_ascii=False, indent=2))
 
     # 4) Deduplication check - by event_id
     event_id = get_event_id(body)
     if is_duplicate_event(event_id):
-        print(f"Duplicate event {event_id}, skipping")
+        logger.info("Duplicate event %s, skipping", event_id)
         return JSONResponse({"ok": True})
 
     # 5) Process event inline (not background) to ensure completion
     instance_code = get_instance_code(body)
-    print(f"Processing event: {event_id}, instance: {instance_code}")
-    await process_approval_event(body)
+    logger.info("Processing event: %s, instance: %s", event_id, instance_code)
+    await process_approval_event(body, raw_body)
 
     return JSONResponse({"ok": True})
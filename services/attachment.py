@@ -1,36 +1,166 @@
-import json
-from dataclasses import dataclass
-from typing import Optional
+import asyncio
+import logging
+
+import orjson
+from dataclasses import dataclass, field
+from typing import BinaryIO, Optional
 
 from .feishu_client import FeishuClient
 
+logger = logging.getLogger(__name__)
+
 
-@dataclass
+@dataclass(slots=True)
 class AttachmentInfo:
     file_token: str
     name: str
     mime_type: str = ""
-    content: Optional[bytes] = None
+    # Spooled temp file from the streamed download (None until downloaded)
+    content: Optional[BinaryIO] = None
     download_url: str = ""
 
 
+@dataclass(slots=True)
+class FormScanResult:
+    """Everything we need from a form, collected in a single traversal."""
+    title: str = ""
+    amount: str = ""
+    attachments: list[AttachmentInfo] = field(default_factory=list)
+
+
 class AttachmentService:
+    # Field names recognized as the approval title / amount
+    TITLE_FIELD_NAMES = ("名称", "付款事由")
+    AMOUNT_FIELD_NAMES = ("金额", "付款金额")
+
     def __init__(self, feishu_client: FeishuClient):
         self.client = feishu_client
 
-    def extract_attachments_from_form(self, form_json: str) -> list[AttachmentInfo]:
-        """Extract attachment info from approval form JSON.
+    def scan_form(self, form: str | bytes | list) -> FormScanResult:
+        """Walk the form once, collecting title, amount and attachments.
+
+        Top-level controls are indexed by field name during the walk, so
+        title and amount resolve as O(1) dict lookups instead of per-field
+        name comparisons; attachments (including nested fieldList rows)
+        are gathered in the same pass.
+        """
+        result = FormScanResult()
+        if isinstance(form, list):
+            form_data = form
+        else:
+            try:
+                form_data = orjson.loads(form)
+            except orjson.JSONDecodeError:
+                return result
+
+        by_name: dict[str, dict] = {}
+        field_lists: list[dict] = []
+        expense_contents: list[str] = []
+        for control in form_data:
+            if not isinstance(control, dict):
+                continue
+
+            control_type = control.get("type", "")
+
+            if control_type in ("attachment", "attachmentV2"):
+                self._extract_from_attachment_control(control, result.attachments)
+            elif control_type == "fieldList":
+                field_lists.append(control)
+            else:
+                by_name.setdefault(control.get("name", ""), control)
+
+        # Title/amount: direct lookups against the name index
+        for name in self.TITLE_FIELD_NAMES:
+            control = by_name.get(name)
+            if control is not None and control.get("type", "") in ("input", "textarea"):
+                result.title = (control.get("value") or "").strip()
+                break
+        for name in self.AMOUNT_FIELD_NAMES:
+            control = by_name.get(name)
+            if control is not None and control.get("type", "") == "amount":
+                ext = control.get("ext", {})
+                currency = ext.get("currency", "SEK") if isinstance(ext, dict) else "SEK"
+                result.amount = f"{control.get('value', '')} {currency}"
+                break
+
+        # fieldList (费用明细) - summed amount lives in ext, rows may carry
+        # nested attachments and 报销内容 cells
+        for control in field_lists:
+            if not result.amount:
+                result.amount = self._amount_from_field_list(control)
+            rows = control.get("value", [])
+            if isinstance(rows, list):
+                for row in rows:
+                    if isinstance(row, list):
+                        self._scan_row(row, result.attachments, expense_contents)
+
+        if expense_contents:
+            result.title = "-".join(expense_contents)
+        return result
+
+    def _scan_row(
+        self,
+        controls: list,
+        attachments: list[AttachmentInfo],
+        expense_contents: list[str],
+    ):
+        """Scan one fieldList row for attachments and 报销内容 cells."""
+        for control in controls:
+            if not isinstance(control, dict):
+                continue
+
+            control_type = control.get("type", "")
+
+            if control_type in ("attachment", "attachmentV2"):
+                self._extract_from_attachment_control(control, attachments)
+            elif control_type == "fieldList":
+                rows = control.get("value", [])
+                if isinstance(rows, list):
+                    for row in rows:
+                        if isinstance(row, list):
+                            self._scan_row(row, attachments, expense_contents)
+            elif control_type == "input" and control.get("name") == "报销内容":
+                content = (control.get("value") or "").strip()
+                if content:
+                    expense_contents.append(content)
+
+    def _amount_from_field_list(self, control: dict) -> str:
+        """Extract the summed amount from a fieldList control's ext."""
+        ext = control.get("ext", [])
+        if not isinstance(ext, list):
+            return ""
+        for item in ext:
+            if isinstance(item, dict) and item.get("type") == "amount":
+                sum_items = item.get("sumItems", "")
+                if sum_items:
+                    try:
+                        sums = orjson.loads(sum_items)
+                        return ", ".join(
+                            f"{s.get('value', '')} {s.get('currency', '')}" for s in sums
+                        )
+                    except orjson.JSONDecodeError:
+                        return item.get("value", "")
+                break
+        return ""
+
+    def extract_attachments_from_form(self, form: str | bytes | list) -> list[AttachmentInfo]:
+        """Extract attachment info from approval form controls.
 
-        The form is a JSON array of form controls. Attachment controls have
-        type "attachmentV2" or "attachment" and contain file info in their value.
+        Accepts either the raw form JSON (str/bytes) or an already-parsed
+        list of controls, so callers that parse the form for other reasons
+        don't pay for a second parse. Attachment controls have type
+        "attachmentV2" or "attachment" and contain file info in their value.
 
         This also handles nested attachments inside fieldList (费用明细) controls.
         """
         attachments = []
-        try:
-            form_data = json.loads(form_json)
-        except json.JSONDecodeError:
-            return attachments
+        if isinstance(form, list):
+            form_data = form
+        else:
+            try:
+                form_data = orjson.loads(form)
+            except orjson.JSONDecodeError:
+                return attachments
 
         self._extract_attachments_recursive(form_data, attachments)
         return attachments
@@ -54,73 +184,77 @@ class AttachmentService:
                 continue
 
             # Handle attachment controls
-            if control_type not in ("attachment", "attachmentV2"):
-                continue
+            if control_type in ("attachment", "attachmentV2"):
+                self._extract_from_attachment_control(control, attachments)
 
-            value = control.get("value")
-            if not value:
-                continue
+    def _extract_from_attachment_control(self, control: dict, attachments: list[AttachmentInfo]):
+        """Extract file entries from a single attachment/attachmentV2 control."""
+        value = control.get("value")
+        if not value:
+            return
 
-            # Value can be a JSON string or already parsed
-            if isinstance(value, str):
-                try:
-                    value = json.loads(value)
-                except json.JSONDecodeError:
-                    # Could be a single URL string
-                    if value.startswith("http"):
-                        attachments.append(
-                            AttachmentInfo(
-                                file_token="",
-                                name="attachment",
-                                download_url=value,
-                            )
-                        )
-                    continue
-
-            # Get filename from ext field if available
-            ext = control.get("ext")
-            ext_filenames = []
-            if isinstance(ext, str) and ext:
-                # ext may contain multiple filenames separated by comma
-                ext_filenames = [name.strip() for name in ext.split(",")]
-            elif isinstance(ext, dict):
-                name = ext.get("name") or ext.get("file_name")
-                if name:
-                    ext_filenames = [name]
-            elif isinstance(ext, list):
-                ext_filenames = ext
-
-            # Handle both single file and list of files
-            files = value if isinstance(value, list) else [value]
-            for i, file_info in enumerate(files):
-                # Handle direct URL strings (common in attachmentV2)
-                if isinstance(file_info, str) and file_info.startswith("http"):
-                    # Use corresponding ext filename if available
-                    filename = ext_filenames[i] if i < len(ext_filenames) else f"attachment_{i+1}"
+        # Value can be a JSON string or already parsed
+        if isinstance(value, str):
+            try:
+                value = orjson.loads(value)
+            except orjson.JSONDecodeError:
+                # Could be a single URL string
+                if value.startswith("http"):
                     attachments.append(
                         AttachmentInfo(
                             file_token="",
-                            name=filename,
-                            download_url=file_info,
+                            name="attachment",
+                            download_url=value,
                         )
                     )
-                    continue
+                return
 
-                if not isinstance(file_info, dict):
-                    continue
-
-                file_token = file_info.get("file_token") or file_info.get("token") or ""
-                file_name = file_info.get("name") or file_info.get("file_name", f"attachment_{i+1}")
-                download_url = file_info.get("url") or file_info.get("download_url") or ""
+        # Get filename from ext field if available
+        ext = control.get("ext")
+        ext_filenames = []
+        if isinstance(ext, str) and ext:
+            # ext may contain multiple filenames separated by comma
+            ext_filenames = [name.strip() for name in ext.split(",")]
+        elif isinstance(ext, dict):
+            name = ext.get("name") or ext.get("file_name")
+            if name:
+                ext_filenames = [name]
+        elif isinstance(ext, list):
+            ext_filenames = ext
 
+        # Handle both single file and list of files
+        files = value if isinstance(value, list) else [value]
+        for i, file_info in enumerate(files):
+            # Handle direct URL strings (common in attachmentV2)
+            if isinstance(file_info, str) and file_info.startswith("http"):
+                # Use corresponding ext filename if available
+                filename = ext_filenames[i] if i < len(ext_filenames) else f"attachment_{i+1}"
                 attachments.append(
                     AttachmentInfo(
-                        file_token=file_token,
-                        name=file_name,
-                        mime_type=file_info.get("mime_type", ""),
-                        download_url=download_url,
+                        file_token="",
+                        name=filename,
+                        download_url=file_info,
                     )
                 )
+                continue
+
+            if not isinstance(file_info, dict):
+                continue
+
+            # Bind .get once; this loop runs per file in every control
+            get = file_info.get
+            file_token = get("file_token") or get("token") or ""
+            file_name = get("name") or get("file_name", f"attachment_{i+1}")
+            download_url = get("url") or get("download_url") or ""
+
+            attachments.append(
+                AttachmentInfo(
+                    file_token=file_token,
+                    name=file_name,
+                    mime_type=get("mime_type", ""),
+                    download_url=download_url,
+                )
+            )
 
     def extract_email_from_form(
         self,
@@ -134,8 +268,8 @@ class AttachmentService:
         Falls back to default_email if not found.
         """
         try:
-            form_data = json.loads(form_json)
-        except json.JSONDecodeError:
+            form_data = orjson.loads(form_json)
+        except orjson.JSONDecodeError:
             return default_email
 
         for control in form_data:
@@ -146,13 +280,13 @@ class AttachmentService:
                 if isinstance(value, str):
                     # Try to parse as JSON in case it's a select option
                     try:
-                        parsed = json.loads(value)
+                        parsed = orjson.loads(value)
                         if isinstance(parsed, list) and parsed:
                             # Select control returns list of selected options
                             return parsed[0] if isinstance(parsed[0], str) else str(parsed[0])
                         elif isinstance(parsed, str):
                             return parsed
-                    except json.JSONDecodeError:
+                    except orjson.JSONDecodeError:
                         pass
                     # Return as-is if it looks like an email
                     if "@" in value:
@@ -162,11 +296,18 @@ class AttachmentService:
 
         return default_email
 
+    # Max concurrent attachment downloads per event
+    DOWNLOAD_CONCURRENCY = 8
+
     async def download_attachments(
         self,
         attachments: list[AttachmentInfo],
     ) -> list[AttachmentInfo]:
-        """Download all attachments and populate their content."""
+        """Download all attachments concurrently and populate their content.
+
+        Downloads are independent I/O, so they run in parallel under a
+        semaphore cap to avoid hammering the Feishu CDN.
+        """
         if not attachments:
             return []
 
@@ -176,18 +317,21 @@ class AttachmentService:
         if file_tokens:
             token_to_url = await self.client.get_file_download_urls(file_tokens)
 
-        downloaded = []
-        for attachment in attachments:
+        sem = asyncio.Semaphore(self.DOWNLOAD_CONCURRENCY)
+
+        async def download_one(attachment: AttachmentInfo) -> Optional[AttachmentInfo]:
             # Use direct download_url if available, otherwise lookup by file_token
             url = attachment.download_url or token_to_url.get(attachment.file_token)
             if not url:
-                print(f"No download URL for {attachment.name}")
-                continue
+                logger.warning("No download URL for %s", attachment.name)
+                return None
             try:
-                content = await self.client.download_file(url)
-                attachment.content = content
-                downloaded.append(attachment)
+                async with sem:
+                    attachment.content = await self.client.download_file(url)
+                return attachment
             except Exception as e:
-                print(f"Failed to download {attachment.name}: {e}")
+                logger.error("Failed to download %s: %s", attachment.name, e)
+                return None
 
-        return downloaded
+        results = await asyncio.gather(*(download_one(a) for a in attachments))
+        return [a for a in results if a is not None]
@@ -1,9 +1,12 @@
+import logging
 from zoneinfo import ZoneInfo
 from datetime import datetime
 import dropbox
 from dropbox.files import WriteMode
 from services.attachment import AttachmentInfo
 
+logger = logging.getLogger(__name__)
+
 STOCKHOLM_TZ = ZoneInfo("Europe/Stockholm")
 
 
@@ -55,14 +58,23 @@ class DropboxUploader:
         """Upload all attachments to Dropbox. Returns list of uploaded paths."""
         uploaded_paths = []
         for att in attachments:
-            if not att.content:
-                print(f"Skipping attachment {att.name}: no content")
+            if att.content is None:
+                logger.info("Skipping attachment %s: no content", att.name)
                 continue
+            # Read one attachment at a time from its spooled temp file so
+            # only a single file's bytes are in memory during upload
+            att.content.seek(0)
+            content = att.content.read()
             path = self._build_path(end_time_ms, approval_name, serial_number, att.name)
             try:
-                uploaded = self.upload_file(att.content, path)
-                print(f"Uploaded to Dropbox: {uploaded}")
+                uploaded = self.upload_file(content, path)
+                logger.info("Uploaded to Dropbox: %s", uploaded)
                 uploaded_paths.append(uploaded)
             except Exception as e:
-                print(f"Failed to upload {att.name} to Dropbox: {e}")
+                logger.error("Failed to upload %s to Dropbox: %s", att.name, e)
+            finally:
+                # Uploads are the last consumer of the content; release the
+                # spooled temp file before moving to the next attachment
+                att.content.close()
+                att.content = None
         return uploaded_paths
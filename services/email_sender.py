@@ -1,3 +1,4 @@
+import asyncio
 import base64
 import resend
 
@@ -26,14 +27,23 @@ class EmailSender:
         for attachment in attachments:
             if attachment.content is None:
                 continue
+            attachment.content.seek(0)
+            content = attachment.content.read()
             resend_attachments.append({
                 "filename": attachment.name,
-                "content": list(attachment.content),  # Resend expects list of bytes
+                # base64 string: encoded in C in one shot, far cheaper than
+                # the list-of-ints form (one Python object per byte)
+                "content": base64.b64encode(content).decode(),
                 "content_type": "application/octet-stream",  # Force as attachment, not inline
                 "headers": {
                     "Content-Disposition": f'attachment; filename="{attachment.name}"',
                 },
             })
+            # Free the download buffer as soon as it's encoded so at most
+            # one attachment's raw bytes are alive during payload assembly
+            attachment.content.close()
+            attachment.content = None
+            del content
 
         # Send email via Resend
         # Use HTML format to prevent email clients from auto-inlining images
@@ -48,4 +58,6 @@ class EmailSender:
         if resend_attachments:
             params["attachments"] = resend_attachments
 
-        resend.Emails.send(params)
+        # The resend SDK is synchronous (blocking HTTP under the hood);
+        # run it in a worker thread so a send doesn't stall the event loop
+        await asyncio.to_thread(resend.Emails.send, params)
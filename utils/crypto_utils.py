@@ -2,11 +2,22 @@
 import base64
 import os
 import hashlib
-from typing import Optional
+from functools import lru_cache
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+_NONCE_SIZE = 12  # bytes, standard for AES-GCM
+
 
 # Use a machine-specific key (or set ENCRYPTION_KEY env var)
+@lru_cache(maxsize=1)
 def _get_key() -> bytes:
-    """Get encryption key from environment or generate from machine ID."""
+    """Get encryption key from environment or generate from machine ID.
+
+    Cached: the key material doesn't change within a process, so the
+    env lookup and SHA-256 run once no matter how many fields decrypt.
+    """
     env_key = os.environ.get("ENCRYPTION_KEY")
     if env_key:
         return hashlib.sha256(env_key.encode()).digest()
@@ -17,20 +28,44 @@ def _get_key() -> bytes:
 
 
 def encrypt(plaintext: str) -> str:
-    """Encrypt a string using XOR with the key (simple but effective for local use)."""
+    """Encrypt a string with AES-256-GCM (authenticated, hardware-accelerated)."""
     key = _get_key()
-    encrypted = bytes(a ^ b for a, b in zip(plaintext.encode(), key * (len(plaintext) // len(key) + 1)))
-    return "ENC:" + base64.b64encode(encrypted).decode()
+    nonce = os.urandom(_NONCE_SIZE)
+    ciphertext = AESGCM(key).encrypt(nonce, plaintext.encode(), None)
+    return "ENC:" + base64.b64encode(nonce + ciphertext).decode()
 
 
 def decrypt(ciphertext: str) -> str:
-    """Decrypt a string."""
+    """Decrypt a string.
+
+    Tries AES-GCM first; values encrypted by the old XOR scheme still
+    decrypt via the legacy fallback. Re-encrypt them with
+    `python crypto_utils.py reencrypt`.
+    """
     if not ciphertext.startswith("ENC:"):
         return ciphertext  # Not encrypted, return as-is
 
     key = _get_key()
-    encrypted = base64.b64decode(ciphertext[4:])
-    decrypted = bytes(a ^ b for a, b in zip(encrypted, key * (len(encrypted) // len(key) + 1)))
+    raw = base64.b64decode(ciphertext[4:])
+    if len(raw) > _NONCE_SIZE:
+        try:
+            return AESGCM(key).decrypt(raw[:_NONCE_SIZE], raw[_NONCE_SIZE:], None).decode()
+        except (InvalidTag, UnicodeDecodeError):
+            pass  # Pre-migration value, fall through to legacy XOR
+    return _legacy_xor_decrypt(raw, key)
+
+
+def _legacy_xor_decrypt(encrypted: bytes, key: bytes) -> str:
+    """Decrypt values produced by the old XOR-with-repeated-key scheme.
+
+    XORs the whole buffer as one big integer instead of per-byte Python
+    iteration; CPython bignums do the XOR word-at-a-time in C.
+    """
+    n = len(encrypted)
+    keystream = (key * (n // len(key) + 1))[:n]
+    decrypted = (
+        int.from_bytes(encrypted, "big") ^ int.from_bytes(keystream, "big")
+    ).to_bytes(n, "big")
     return decrypted.decode()
 
 
@@ -43,9 +78,20 @@ def encrypt_value_interactive():
     print(f"\nEncrypted value (copy to .env):\n{encrypted}")
 
 
+def reencrypt_value_interactive():
+    """Interactive tool to re-encrypt an old XOR-encrypted value with AES-GCM."""
+    print("Paste the old ENC: value (input hidden):")
+    import getpass
+    old_value = getpass.getpass("> ")
+    reencrypted = encrypt(decrypt(old_value))
+    print(f"\nRe-encrypted value (copy to .env):\n{reencrypted}")
+
+
 if __name__ == "__main__":
     import sys
     if len(sys.argv) > 1 and sys.argv[1] == "encrypt":
         encrypt_value_interactive()
+    elif len(sys.argv) > 1 and sys.argv[1] == "reencrypt":
+        reencrypt_value_interactive()
     else:
-        print("Usage: python crypto_utils.py encrypt")
+        print("Usage: python crypto_utils.py encrypt|reencrypt")